@@ -12,10 +12,12 @@ import sys
 import os
 import time
 from urllib.parse import urljoin, urlparse
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
+from itertools import chain, product
 import threading
-from concurrent.futures import ThreadPoolExecutor
-import json
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import orjson
 import hashlib
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -23,17 +25,45 @@ import sqlite3
 from contextlib import contextmanager
 import logging
 
+# Largest response body read from a single page
+_MAX_CONTENT_BYTES = 5 * 1024 * 1024
+
+# Precompiled patterns shared by every page and link
+_WS_RE = re.compile(r'\s+')
+_SPECIAL_RE = re.compile(r'\b\w+[!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>/?]+\w*\b')
+# Emails, phone numbers (international formats), versions and years in one pass
+_ENTITY_RE = re.compile(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'
+    r'|(?P<phone>\+\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}'
+    r'|\(\d{3}\)\s*\d{3}[-.\s]?\d{4}'
+    r'|\d{3}[-.\s]?\d{3}[-.\s]?\d{4})'
+    r'|(?P<version>\b(?:v|version)\s*[0-9]+\.[0-9]+(?:\.[0-9]+)?\b)'
+    r'|(?P<year>\b(?:19|20)\d{2}\b)',
+    re.IGNORECASE
+)
+# Common non-content links
+_SKIP_PREFIXES = ('javascript:', 'mailto:', 'tel:', '#')
+_SKIP_SUFFIX_RE = re.compile(r'\.(pdf|docx?|xlsx?|pptx?|zip|rar|tar|gz|jpe?g|png|gif|bmp|svg|webp|css|js)$', re.IGNORECASE)
+
 class AdvancedCeWL:
     def __init__(self, max_depth=2, threads=10, delay=1, min_word_length=3):
         self.max_depth = max_depth
         self.threads = threads
         self.delay = delay
         self.min_word_length = min_word_length
-        self.visited_urls = set()
+        self._word_re = re.compile(rf'\b[a-zA-Z0-9]{{{min_word_length},}}\b')
+        # Segments of camelCase words: the lowercase head and each capitalized part
+        self._camel_re = re.compile(rf'[a-z]{{{min_word_length},}}(?=[A-Z][a-z])'
+                                    rf'|(?<=[a-z])[A-Z][a-z]{{{max(min_word_length - 1, 1)},}}')
+        self.visited_urls = set()  # Fixed-size digests of crawled URLs
         self.words = Counter()
         self.emails = set()
         self.phone_numbers = set()
         self.metadata = defaultdict(list)
+        self._lock = threading.Lock()  # Guards results shared by crawler threads
+        self._driver_lock = threading.Lock()  # Guards the Selenium driver list
+        self._host_lock = threading.Lock()
+        self._next_request = {}  # Host -> earliest time of its next request
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -47,198 +77,259 @@ class AdvancedCeWL:
         self.setup_selenium()
 
     def setup_selenium(self):
-        """Setup headless Chrome for JavaScript rendering"""
+        """Setup a pool of headless Chrome drivers for JavaScript rendering"""
+        self._driver_pool = queue.Queue()
+        self._drivers = []
+        self._drivers_starting = 0  # Drivers being started outside the lock
         try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.set_page_load_timeout(30)
+            self._driver_pool.put(self.create_driver())
         except Exception as e:
             self.logger.warning(f"Selenium setup failed: {e}")
-            self.driver = None
+
+    def create_driver(self):
+        """Start a headless Chrome instance and register it with the pool"""
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(30)
+        with self._driver_lock:
+            self._drivers.append(driver)
+        return driver
+
+    @contextmanager
+    def checkout_driver(self):
+        """Borrow a driver, starting a new one (up to one per thread) if all are busy"""
+        try:
+            driver = self._driver_pool.get_nowait()
+        except queue.Empty:
+            # Reserve the slot under the lock so concurrent callers can't exceed the cap
+            with self._driver_lock:
+                spawn = len(self._drivers) + self._drivers_starting < self.threads
+                if spawn:
+                    self._drivers_starting += 1
+            if spawn:
+                try:
+                    driver = self.create_driver()
+                finally:
+                    with self._driver_lock:
+                        self._drivers_starting -= 1
+            else:
+                driver = self._driver_pool.get()
+        try:
+            yield driver
+        finally:
+            self._driver_pool.put(driver)
+
+    def close(self):
+        """Quit all Selenium drivers"""
+        with self._driver_lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
 
     def extract_words_advanced(self, text):
-        """Advanced word extraction with multiple techniques"""
-        words = set()
-        
-        # Basic word extraction
-        basic_words = re.findall(r'\b[a-zA-Z0-9]{%d,}\b' % self.min_word_length, text.lower())
-        words.update(basic_words)
+        """Advanced word extraction with multiple techniques, returns every occurrence"""
+        # Basic word extraction, lowercasing matches rather than the whole page.
+        # This also covers Title Case product names and brands.
+        basic_words = map(str.lower, self._word_re.findall(text))
         
-        # Extract camelCase words
-        camel_case = re.findall(r'[a-z]+[A-Z][a-z]+', text)
-        for word in camel_case:
-            # Split camelCase into separate words
-            split_words = re.findall(r'[A-Z]?[a-z]+', word)
-            words.update([w.lower() for w in split_words if len(w) >= self.min_word_length])
+        # Extract camelCase words, split into separate words
+        camel_words = map(str.lower, self._camel_re.findall(text))
         
         # Extract words with special characters (for passwords)
-        special_words = re.findall(r'\b\w+[!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>/?]+\w*\b', text)
-        words.update([w.lower() for w in special_words])
-        
-        # Extract product names, brands (Title Case)
-        title_case = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', text)
-        for phrase in title_case:
-            words.update([w.lower() for w in phrase.split() if len(w) >= self.min_word_length])
+        special_words = map(str.lower, _SPECIAL_RE.findall(text))
         
-        return words
+        return chain(basic_words, camel_words, special_words)
 
     def extract_entities(self, text, url):
         """Extract various entities from text"""
-        # Email addresses
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-        self.emails.update(emails)
-        
-        # Phone numbers (international formats)
-        phone_patterns = [
-            r'\+\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}',
-            r'\(\d{3}\)\s*\d{3}[-.\s]?\d{4}',
-            r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'
-        ]
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
-            self.phone_numbers.update(phones)
+        found = defaultdict(list)
+        for match in _ENTITY_RE.finditer(text):
+            found[match.lastgroup].append(match.group())
         
-        # Copyright years and versions
-        years = re.findall(r'\b(19|20)\d{2}\b', text)
-        versions = re.findall(r'\b(v|version)?\s*[0-9]+\.[0-9]+(\.[0-9]+)?\b', text, re.IGNORECASE)
+        self.emails.update(found['email'])
+        self.phone_numbers.update(found['phone'])
         
-        # Add to metadata
-        self.metadata['years'].extend(years)
-        self.metadata['versions'].extend([v[0] for v in versions if v[0]])
+        # Copyright years and versions
+        self.metadata['years'].extend(found['year'])
+        self.metadata['versions'].extend(found['version'])
+
+    def wait_for_host(self, url):
+        """Block until the next request to this URL's host is due, shared by all threads"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            now = time.monotonic()
+            due = max(now, self._next_request.get(host, now))
+            self._next_request[host] = due + self.delay
+        time.sleep(due - now)
 
     def get_page_content(self, url):
-        """Get page content with multiple methods"""
+        """Get page content over HTTP, skipping non-HTML and oversized bodies"""
         content = ""
         
         try:
-            # Try requests first
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            content = response.text
-            
-            # If minimal content, try Selenium for JS-rendered pages
-            if len(content) < 1000 and self.driver:
-                self.logger.info(f"Using Selenium for JS-heavy page: {url}")
+            with self.session.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type.lower():
+                    self.logger.info(f"Skipping non-HTML content ({content_type}): {url}")
+                    return content
+                if int(response.headers.get('Content-Length') or 0) > _MAX_CONTENT_BYTES:
+                    self.logger.info(f"Skipping oversized page: {url}")
+                    return content
+                # Cap decoded bytes, a small gzip body can inflate far past the limit
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    body += chunk
+                    if len(body) >= _MAX_CONTENT_BYTES:
+                        del body[_MAX_CONTENT_BYTES:]
+                        break
                 try:
-                    self.driver.get(url)
-                    time.sleep(2)  # Wait for JS execution
-                    content = self.driver.page_source
-                except:
-                    pass
-                    
+                    content = body.decode(response.encoding or 'utf-8', 'replace')
+                except LookupError:
+                    # Unknown charset label (e.g. "none", "utf8mb4"), like response.text
+                    content = body.decode('utf-8', 'replace')
         except Exception as e:
             self.logger.warning(f"Failed to fetch {url}: {e}")
             
         return content
 
+    def needs_rendering(self, soup):
+        """Check for a script-driven page with next to no static body text"""
+        if not self._drivers or soup.find('script') is None:
+            return False
+        body = soup.find('body')
+        return body is None or len(body.get_text(strip=True)) < 200
+
+    def render_page(self, url):
+        """Get page content from headless Chrome for JS-rendered pages"""
+        self.logger.info(f"Using Selenium for JS-heavy page: {url}")
+        content = ""
+        try:
+            with self.checkout_driver() as driver:
+                driver.get(url)
+                time.sleep(2)  # Wait for JS execution
+                content = driver.page_source
+        except Exception as e:
+            self.logger.warning(f"Selenium failed for {url}: {e}")
+        return content
+
     def extract_metadata(self, soup, url):
         """Extract metadata from HTML"""
-        # Meta tags
-        meta_tags = soup.find_all('meta')
-        for meta in meta_tags:
-            name = meta.get('name', '').lower()
+        # Meta and OpenGraph tags in one pass
+        for meta in soup.find_all('meta'):
             content = meta.get('content', '')
-            if content:
-                self.metadata[f'meta_{name}'].append(content)
-        
-        # OpenGraph tags
-        og_tags = soup.find_all('meta', property=re.compile(r'^og:'))
-        for tag in og_tags:
-            prop = tag.get('property', '')
-            content = tag.get('content', '')
-            if content:
+            if not content:
+                continue
+            prop = meta.get('property', '')
+            if prop.startswith('og:'):
                 self.metadata[prop].append(content)
+            else:
+                name = meta.get('name', '').lower()
+                self.metadata[f'meta_{name}'].append(content)
         
         # JSON-LD structured data
         json_ld = soup.find_all('script', type='application/ld+json')
         for script in json_ld:
+            if script.string is None:
+                continue
             try:
-                data = json.loads(script.string)
+                # orjson rejects str subclasses such as bs4's Script
+                data = orjson.loads(script.string.encode('utf-8'))
                 self.extract_json_ld(data)
             except:
                 pass
 
     def extract_json_ld(self, data):
         """Extract information from JSON-LD structured data"""
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if isinstance(value, str) and len(value) > 2:
-                    self.metadata['json_ld'].append(f"{key}: {value}")
-                elif isinstance(value, (list, dict)):
-                    self.extract_json_ld(value)
-        elif isinstance(data, list):
-            for item in data:
-                self.extract_json_ld(item)
+        pending = deque([data])
+        while pending:
+            node = pending.popleft()
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    if isinstance(value, str) and len(value) > 2:
+                        self.metadata['json_ld'].append(f"{key}: {value}")
+                    elif isinstance(value, (list, dict)):
+                        pending.append(value)
+            elif isinstance(node, list):
+                pending.extend(node)
 
     def analyze_page(self, url, depth=0):
-        """Comprehensive page analysis"""
-        if depth > self.max_depth or url in self.visited_urls:
-            return
-            
-        self.visited_urls.add(url)
+        """Comprehensive page analysis, returns the links to crawl next"""
         self.logger.info(f"Analyzing [{depth}]: {url}")
         
+        self.wait_for_host(url)  # Be polite
         content = self.get_page_content(url)
         if not content:
-            return
+            return []
             
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = BeautifulSoup(content, 'lxml')
+        
+        # Re-fetch through a browser if the page is built by JavaScript
+        if self.needs_rendering(soup):
+            self.wait_for_host(url)
+            rendered = self.render_page(url)
+            if rendered:
+                soup = BeautifulSoup(rendered, 'lxml')
+        
+        # Metadata first, JSON-LD lives in <script> tags
+        with self._lock:
+            self.extract_metadata(soup, url)
         
         # Remove script and style elements
         for script in soup(["script", "style"]):
             script.decompose()
         
         # Extract text content
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        text = _WS_RE.sub(' ', soup.get_text(separator=' ')).strip()
         
         # Extract words and entities
         words = self.extract_words_advanced(text)
-        for word in words:
-            self.words[word] += 1
+        with self._lock:
+            self.words.update(words)
+            self.extract_entities(text, url)
         
-        self.extract_entities(text, url)
-        self.extract_metadata(soup, url)
-        
-        # Extract links for recursive crawling
+        # Extract links to add to the crawl worklist
+        follow = []
         if depth < self.max_depth:
+            parsed_base = urlparse(url)
             links = soup.find_all('a', href=True)
             for link in links:
                 full_url = urljoin(url, link['href'])
-                if self.should_follow_link(full_url, url):
-                    time.sleep(self.delay)  # Be polite
-                    self.analyze_page(full_url, depth + 1)
+                if self.should_follow_link(full_url, parsed_base):
+                    follow.append(full_url)
+        return follow
 
-    def should_follow_link(self, link, base_url):
-        """Determine if we should follow a link"""
+    def mark_visited(self, url):
+        """Record a URL as crawled, returns False if it was already seen"""
+        # Fragments point into the same page; store a 16-byte digest, not the URL
+        key = hashlib.blake2b(url.partition('#')[0].encode('utf-8'), digest_size=16).digest()
+        if key in self.visited_urls:
+            return False
+        self.visited_urls.add(key)
+        return True
+
+    def should_follow_link(self, link, parsed_base):
+        """Determine if we should follow a link from an already parsed base URL"""
+        if link[:11].lower().startswith(_SKIP_PREFIXES):
+            return False
+            
         parsed_link = urlparse(link)
-        parsed_base = urlparse(base_url)
         
         # Skip external domains
         if parsed_link.netloc and parsed_link.netloc != parsed_base.netloc:
             return False
             
-        # Skip common non-content links
-        skip_patterns = [
-            r'\.(pdf|doc|docx|xls|xlsx|ppt|pptx|zip|rar|tar|gz)$',
-            r'\.(jpg|jpeg|png|gif|bmp|svg|webp)$',
-            r'\.(css|js)$',
-            r'^javascript:',
-            r'^mailto:',
-            r'^tel:',
-            r'^#',
-        ]
-        
-        for pattern in skip_patterns:
-            if re.search(pattern, link, re.IGNORECASE):
-                return False
+        # Skip documents, images and static assets
+        if _SKIP_SUFFIX_RE.search(parsed_link.path):
+            return False
                 
         return True
 
@@ -250,30 +341,39 @@ class AdvancedCeWL:
         wordlists['basic'] = [word for word, count in self.words.most_common()]
         
         # Password wordlist (words + numbers/special chars)
-        password_words = set()
-        for word in self.words:
-            if len(word) >= 6:
-                password_words.add(word)
-                password_words.add(f"{word}123")
-                password_words.add(f"{word}!")
-                password_words.add(f"{word}2024")
-                password_words.add(f"{word}1")
-        wordlists['passwords'] = sorted(password_words)
+        suffixes = ('', '123', '!', '2024', '1')
+        long_words = sorted(word for word in self.words if len(word) >= 6)
+        # word + suffix can collide with another word (shadow1 = shadow + '1')
+        wordlists['passwords'] = list(dict.fromkeys(map(''.join, product(long_words, suffixes))))
         
         # Username wordlist (shorter words)
         wordlists['usernames'] = [word for word in self.words if 3 <= len(word) <= 12]
         
         # Directory wordlist (for fuzzing)
-        wordlists['directories'] = [f"/{word}/" for word in self.words if len(word) >= 3]
+        path_words = [word for word in self.words if len(word) >= 3]
+        wordlists['directories'] = [f"/{word}/" for word in path_words]
         
-        # API endpoints (common patterns)
+        # API endpoints (common patterns), one path per line
         api_patterns = ['api', 'v1', 'v2', 'rest', 'graphql']
-        wordlists['endpoints'] = []
-        for pattern in api_patterns:
-            wordlists['endpoints'].extend([f"/{pattern}/{word}", f"/{word}/{pattern}"] for word in self.words if len(word) >= 3)
+        wordlists['endpoints'] = [path for pattern in api_patterns for word in path_words
+                                  for path in (f"/{pattern}/{word}", f"/{word}/{pattern}")]
         
         return wordlists
 
+    def write_lines(self, filename, lines):
+        """Write one entry per line with a single write call"""
+        data = '\n'.join(lines)
+        if data:
+            data += '\n'
+        with open(filename, 'wb') as f:
+            f.write(data.encode('utf-8'))
+
+    def write_json(self, filename, data):
+        """Write indented JSON with a single write call"""
+        # orjson serializes dict subclasses such as defaultdict without a copy
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
     def save_results(self, base_filename):
         """Save all results to files"""
         # Generate wordlists
@@ -282,26 +382,19 @@ class AdvancedCeWL:
         # Save wordlists
         for list_type, words in wordlists.items():
             filename = f"{base_filename}_{list_type}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                for word in words:
-                    f.write(f"{word}\n")
+            self.write_lines(filename, words)
             self.logger.info(f"Saved {len(words)} words to {filename}")
         
         # Save emails
         if self.emails:
-            with open(f"{base_filename}_emails.txt", 'w') as f:
-                for email in sorted(self.emails):
-                    f.write(f"{email}\n")
+            self.write_lines(f"{base_filename}_emails.txt", sorted(self.emails))
         
         # Save phone numbers
         if self.phone_numbers:
-            with open(f"{base_filename}_phones.txt", 'w') as f:
-                for phone in sorted(self.phone_numbers):
-                    f.write(f"{phone}\n")
+            self.write_lines(f"{base_filename}_phones.txt", sorted(self.phone_numbers))
         
         # Save metadata
-        with open(f"{base_filename}_metadata.json", 'w') as f:
-            json.dump(dict(self.metadata), f, indent=2)
+        self.write_json(f"{base_filename}_metadata.json", self.metadata)
         
         # Save analysis report
         report = {
@@ -312,25 +405,29 @@ class AdvancedCeWL:
             'top_words': self.words.most_common(20)
         }
         
-        with open(f"{base_filename}_report.json", 'w') as f:
-            json.dump(report, f, indent=2)
+        self.write_json(f"{base_filename}_report.json", report)
 
     def analyze_site(self, start_url):
         """Main analysis function"""
         self.logger.info(f"Starting advanced analysis of: {start_url}")
         start_time = time.time()
         
-        self.analyze_page(start_url)
-        
-        # Multi-threaded analysis for larger sites
-        if len(self.visited_urls) < 50:  # If small site, analyze more deeply
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                futures = []
-                for url in list(self.visited_urls):
-                    futures.append(executor.submit(self.analyze_page, url, 1))
+        # Breadth-first crawl from a worklist, keeping every thread busy
+        frontier = deque([(start_url, 0)])
+        self.mark_visited(start_url)
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            running = {}
+            while frontier or running:
+                while frontier and len(running) < self.threads:
+                    url, depth = frontier.popleft()
+                    running[executor.submit(self.analyze_page, url, depth)] = depth
                 
-                for future in futures:
-                    future.result()
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = running.pop(future)
+                    for link in future.result():
+                        if self.mark_visited(link):
+                            frontier.append((link, depth + 1))
         
         analysis_time = time.time() - start_time
         self.logger.info(f"Analysis completed in {analysis_time:.2f} seconds")
@@ -340,9 +437,9 @@ class AdvancedCeWL:
         self.logger.info(f"Found {len(self.phone_numbers)} phone numbers")
 
     def __del__(self):
-        """Cleanup Selenium driver"""
-        if hasattr(self, 'driver') and self.driver:
-            self.driver.quit()
+        """Cleanup Selenium drivers"""
+        if hasattr(self, '_drivers'):
+            self.close()
 
 def main():
     parser = argparse.ArgumentParser(description='CeWL++ - Advanced Web Content Analyzer')
@@ -391,8 +488,7 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}")
     finally:
-        if hasattr(analyzer, 'driver') and analyzer.driver:
-            analyzer.driver.quit()
+        analyzer.close()
 
 if __name__ == "__main__":
     main()